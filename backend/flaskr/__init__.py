@@ -1,27 +1,87 @@
 import os
-from flask import Flask, request, abort, jsonify
+import orjson
+from flask import Flask, Response, request, abort
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-import random
+from flask_caching import Cache
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
 
-from models import setup_db, Question, Category
+from models import setup_db, db, Question, Category
 
 QUESTIONS_PER_PAGE = 10
+CATEGORIES_TIMEOUT = 600
+
+CACHE_TYPE = os.getenv('CACHE_TYPE', 'SimpleCache')
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://127.0.0.1:6379/0')
+
+cache = Cache()
+
+'''
+jsonify(payload)
+    serializes the payload with orjson, which is much faster than the
+    stdlib encoder behind flask.jsonify. Integer keys (categories) are
+    written as strings, as flask.jsonify does.
+'''
+def jsonify(payload):
+    return Response(
+        orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS),
+        mimetype='application/json')
 
 def paginate_questions(request, selection):
     page = request.args.get('page', 1, type=int)
     start = (page - 1) * QUESTIONS_PER_PAGE
-    end = start + QUESTIONS_PER_PAGE
 
-    questions = [question.format() for question in selection]
-    current_questions = questions[start:end]
+    if start < 0:
+        return []
+
+    #let the database slice the page instead of loading every row.
+    questions = selection.limit(QUESTIONS_PER_PAGE).offset(start).all()
+    current_questions = [question._asdict() for question in questions]
 
     return current_questions
 
+'''
+count_questions(selection)
+    counts the rows matched by the selection in a plain SELECT count(),
+    dropping its ORDER BY and columns so no ordered subquery is scanned.
+'''
+def count_questions(selection):
+    return selection.order_by(None).with_entities(
+        func.count(Question.id)).scalar()
+
+'''
+read-only projection of the question columns, the rows are plain tuples
+so list endpoints skip building Question instances.
+'''
+def select_questions():
+    return Question.query.with_entities(
+        Question.id,
+        Question.question,
+        Question.answer,
+        Question.category,
+        Question.difficulty)
+
+'''
+categories rarely change, so they are kept in the cache instead of being
+queried on every request. Clear them with cache.delete_memoized(get_categories)
+and cache.delete('view//categories') if categories are edited.
+'''
+@cache.memoize(CATEGORIES_TIMEOUT)
+def get_categories():
+    categories = Category.query.with_entities(Category.id, Category.type)
+
+    return {category.id: category.type for category in categories}
+
 def create_app(test_config=None):
     # create and configure the app
     app = Flask(__name__)
     setup_db(app)
+    cache.init_app(app, config={
+        'CACHE_TYPE': CACHE_TYPE,
+        'CACHE_REDIS_URL': CACHE_REDIS_URL,
+        'CACHE_DEFAULT_TIMEOUT': 300
+    })
 
     #Cors to allow '*' for origins.
     CORS(app, resources=r'/api/*')
@@ -37,6 +97,11 @@ def create_app(test_config=None):
             "Access-Control-Allow-Methods",
             "GET,PUT,POST,DELETE,OPTIONS")
 
+        #lets clients revalidate GET responses and get a 304 when unchanged.
+        if request.method == 'GET' and response.status_code == 200:
+            response.add_etag()
+            response.make_conditional(request)
+
         return response
 
     '''
@@ -47,23 +112,18 @@ def create_app(test_config=None):
     @app.route('/questions', methods=['GET'])
     def retrieve_questions():
 
-        selection = Question.query.order_by(Question.id)
+        selection = select_questions().order_by(Question.id)
         current_questions = paginate_questions(request, selection)
 
-        categories = Category.query.all()
-        categories_dict = {}
-        for category in categories:
-            categories_dict[category.id] = category.type
-
         if len(current_questions) == 0:
             abort(404)
         
         return jsonify({
             'success': True,
             'questions': current_questions,
-            'total_questions': len(Question.query.all()),
+            'total_questions': count_questions(selection),
             'current category': None,
-            'categories': categories_dict
+            'categories': get_categories()
         })
 
 
@@ -72,20 +132,22 @@ def create_app(test_config=None):
     '''
 
     @app.route('/categories', methods=['GET'])
+    @cache.cached(timeout=CATEGORIES_TIMEOUT)
     def retrive_categories():
-        categories = Category.query.all()
-        categories_dict = {}
-        for category in categories:
-            categories_dict[category.id] = category.type
+        categories_dict = get_categories()
 
-        if len(categories) == 0:
+        if len(categories_dict) == 0:
             abort(404)
 
-        return jsonify({
+        response = jsonify({
             'success': True,
             'categories': categories_dict,
             'total_categories': len(categories_dict)
         })
+        response.cache_control.public = True
+        response.cache_control.max_age = 60
+
+        return response
 
 
     '''
@@ -96,24 +158,24 @@ def create_app(test_config=None):
     def retrieve_questions_by_category(category_id):
 
         try:
-            questions_by_category = Question.query.order_by(
-                Question.id).filter(Question.category == category_id).all()
+            questions_by_category = select_questions().order_by(
+                Question.id).filter(Question.category == category_id)
             questions_paginated = paginate_questions(request, questions_by_category)
-
-            if len(questions_paginated) == 0:
-                abort(404)
-
-            else:
-                return jsonify({
-                    'success': True,
-                    'questions': questions_paginated,
-                    'total_questions': len(Question.query.filter(
-                            Question.category == category_id).all()),
-                    'current_category': category_id
-                })
-        except BaseException:
+            total_questions = count_questions(questions_by_category)
+        except SQLAlchemyError:
+            db.session.rollback()
             abort(422) #not able to process request
 
+        if len(questions_paginated) == 0:
+            abort(422) #no questions for this category or page
+
+        return jsonify({
+            'success': True,
+            'questions': questions_paginated,
+            'total_questions': total_questions,
+            'current_category': category_id
+        })
+
     '''
     endpoint to DELETE question using a question ID. 
     '''
@@ -126,21 +188,22 @@ def create_app(test_config=None):
             question = Question.query.filter(
                 Question.id == question_id).one_or_none()
 
-            if question is None:
-                abort(404)
-            
-            else:
+            if question is not None:
                 question.delete()
 
-            return jsonify({
-                'success': True,
-                'deleted': question.format(),
-                'deleted_id': question_id,
-            })
-
-        except BaseException:
+        except SQLAlchemyError:
+            db.session.rollback()
             abort(422)  #not able to process request
 
+        if question is None:
+            abort(422)  #nothing to delete
+
+        return jsonify({
+            'success': True,
+            'deleted': question.format(),
+            'deleted_id': question_id,
+        })
+
 
     '''
     endpoint to POST a new question, 
@@ -169,7 +232,8 @@ def create_app(test_config=None):
                 'success': True,
                 'created': question.id
             })
-        except BaseException:
+        except SQLAlchemyError:
+            db.session.rollback()
             abort(422) #not able to process request
 
     '''
@@ -182,7 +246,10 @@ def create_app(test_config=None):
         body = request.get_json()
         search = body.get('searchTerm', None)
 
-        questions = Question.query.order_by(Question.id).filter(
+        #substring match, as the API promises. Full-text search was not
+        #used because its stemmed word matching misses partial words; the
+        #questions_question_trgm index serves this ILIKE instead.
+        questions = select_questions().order_by(Question.id).filter(
                 Question.question.ilike('%{}%'.format(search)))
 
         questions_paginated = paginate_questions(request, questions)
@@ -201,7 +268,6 @@ def create_app(test_config=None):
     def retrieve_quizzes():
 
         #get RAW data
-        questions = None
         body = request.get_json()
         quiz_category = body.get('quiz_category', None)
         previous_questions = body.get('previous_questions', None)
@@ -209,35 +275,34 @@ def create_app(test_config=None):
 
         try:
 
+            questions = Question.query
+
             #check category
-            if category_id == 0:
-                questions = Question.query.all()
-            else:
-                category_id = quiz_category['id']
-                questions = Question.query.filter(
-                        Question.category == category_id).all()
-            
-            new_questions = []
-
-            for question in questions:
-                if question.id not in previous_questions:
-                    new_questions.append(question)
-
-            if new_questions== []:
-                formatted_question = 0
-
-            else:
-                #get a random question from database.
-                question = random.choice(questions)
-                formatted_question = question.format()
-                previous_questions.append(question)
-
-                return jsonify({
-                    'success': True,
-                    'question': formatted_question
-                })    
-        except BaseException:
-            abort(404) #not found
+            if category_id != 0:
+                questions = questions.filter(Question.category == category_id)
+
+            #skip questions already played
+            if previous_questions:
+                questions = questions.filter(
+                        ~Question.id.in_(previous_questions))
+
+            #get a random question from database.
+            question = questions.order_by(func.random()).first()
+        except SQLAlchemyError:
+            db.session.rollback()
+            abort(422) #not able to process request
+
+        #no questions left, the frontend ends the quiz.
+        if question is None:
+            return jsonify({
+                'success': True,
+                'question': False
+            })
+
+        return jsonify({
+            'success': True,
+            'question': question.format()
+        })
 
     '''
     Error handlers for all expected errors
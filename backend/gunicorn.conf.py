@@ -0,0 +1,20 @@
+import os
+from psycogreen.gevent import patch_psycopg
+
+# the workers boot in parallel and would race each other running
+# create_all(), so the schema has to come from trivia.psql instead
+os.environ.setdefault('DB_CREATE_ALL', 'false')
+
+# gevent workers overlap the time requests spend waiting on Postgres
+bind = os.getenv('BIND', '127.0.0.1:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+worker_class = 'gevent'
+worker_connections = int(os.getenv('WORKER_CONNECTIONS', 100))
+
+'''
+post_fork(server, worker)
+    makes psycopg2 cooperative so a query yields to other greenlets
+    instead of blocking the whole worker
+'''
+def post_fork(server, worker):
+    patch_psycopg()
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import Column, String, Integer, create_engine
+from sqlalchemy import Column, String, Integer, Index, DDL, create_engine, event
 from flask_sqlalchemy import SQLAlchemy
 import json
 
@@ -17,6 +17,11 @@ DB_PATH = 'postgresql+psycopg2://{}:{}@{}/{}'.format(
     DB_NAME
     )
 
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 5))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 5))
+DB_CREATE_ALL = os.getenv('DB_CREATE_ALL', 'true').lower() == 'true'
+
 db = SQLAlchemy()
 
 '''
@@ -26,9 +31,16 @@ setup_db(app)
 def setup_db(app, database_path=DB_PATH):
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_pre_ping': True
+    }
     db.app = app
     db.init_app(app)
-    db.create_all()
+    if DB_CREATE_ALL:
+        db.create_all()
 
 '''
 Question
@@ -43,6 +55,15 @@ class Question(db.Model):
   category = Column(String)
   difficulty = Column(Integer)
 
+  __table_args__ = (
+    Index(
+      'questions_question_trgm',
+      question,
+      postgresql_using='gin',
+      postgresql_ops={'question': 'gin_trgm_ops'}),
+    Index('questions_category_id_idx', category, id),
+  )
+
   def __init__(self, question, answer, category, difficulty):
     self.question = question
     self.answer = answer
@@ -69,6 +90,12 @@ class Question(db.Model):
       'difficulty': self.difficulty
     }
 
+# the trigram index needs pg_trgm, which lets ILIKE '%term%' use the index
+event.listen(
+  Question.__table__,
+  'before_create',
+  DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+
 '''
 Category
 
@@ -48,6 +48,17 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(data['questions'])
         self.assertTrue(data['total_questions'])    
     
+    def test_retrieve_questions_match_format(self):
+        res = self.client().get('/questions')
+        data = json.loads(res.data)
+
+        with self.app.app_context():
+            question = Question.query.order_by(Question.id).first()
+            format_keys = set(question.format())
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(set(data['questions'][0]), format_keys)
+
     def test_retrieve_categories(self):
         res = self.client().get('/categories')
         data = json.loads(res.data)
@@ -56,6 +67,13 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['success'], True)
         self.assertTrue(data['categories'])
 
+    def test_304_retrieve_categories(self):
+        etag = self.client().get('/categories').headers['ETag']
+        res = self.client().get('/categories', headers={'If-None-Match': etag})
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.data, b'')
+
     def test_404_invalid_page(self):
         res = self.client().get('/questions?page=100')
         data = json.loads(res.data)
@@ -140,6 +158,32 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['success'], True)
         self.assertTrue(data['question'])
 
+    def test_quiz_skips_previous_questions(self):
+        with self.app.app_context():
+            art_ids = [question.id for question in Question.query.filter(
+                    Question.category == 2).order_by(Question.id).all()]
+
+        res = self.client().post('/quizzes', 
+        json={'quiz_category':{'type':'Art', 'id': 2}, 'previous_questions':art_ids[:-1]})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(data['question']['id'], art_ids[-1])
+
+    def test_quiz_no_questions_left(self):
+        with self.app.app_context():
+            art_ids = [question.id for question in Question.query.filter(
+                    Question.category == 2).all()]
+
+        res = self.client().post('/quizzes', 
+        json={'quiz_category':{'type':'Art', 'id': 2}, 'previous_questions':art_ids})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(data['question'], False)
+
     def test_405_quiz(self):
         res = self.client().patch('/quizzes', 
         json={'quiz_category':{'type':'Art', 'id': 2}, 'previous_questions':[2]})